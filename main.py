@@ -1,10 +1,21 @@
 import gpiod
+import ctypes
+import errno
+import logging
+import logging.handlers
+import os
+import selectors
+import sys
 import time
 import socket
 import threading
+import queue
+import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
+from matplotlib.colors import to_rgba
 from collections import deque, defaultdict
+from dataclasses import dataclass, field
 from datetime import datetime
 
 # Constants for GPIO pins and communication protocol
@@ -12,264 +23,548 @@ BUTTON_PIN = 22  # GPIO pin for the button
 YELLOW_LED_PIN = 26  # GPIO pin for yellow LED
 RPi_startBit = "+++"  # Start delimiter for messages
 RPi_endBit = "***"  # End delimiter for messages
+RPi_startBit_bytes = RPi_startBit.encode('ascii')  # Delimiters as bytes for raw datagram checks
+RPi_endBit_bytes = RPi_endBit.encode('ascii')
+RESET_MSG = (RPi_startBit + "RESET_REQUESTED" + RPi_endBit).encode('ascii')  # Pre-encoded broadcast
 localPort = 4210  # Port to listen for incoming UDP messages
+DEBUG = False  # Set True to log every received datagram to udp_debug.log
+
+# Per-packet diagnostics go through a queue-backed logger so the consumer
+# thread never blocks on the console or the disk; a background listener
+# thread drains the queue into a size-capped rotating file
+udp_logger = logging.getLogger("udp")
+udp_logger.setLevel(logging.INFO if DEBUG else logging.WARNING)
+_log_queue = queue.SimpleQueue()
+udp_logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+_udp_listener = logging.handlers.QueueListener(
+    _log_queue,
+    # delay=True: don't create udp_debug.log until a record is actually emitted
+    logging.handlers.RotatingFileHandler("udp_debug.log", maxBytes=1_000_000, backupCount=2,
+                                         delay=True))
+_udp_listener.start()
 
 # Initialize GPIO chip and request lines for button and LEDs
 chip = gpiod.Chip('gpiochip4')
 button_line = chip.get_line(BUTTON_PIN)
-button_line.request(consumer="Button", type=gpiod.LINE_REQ_DIR_IN)
+button_line.request(consumer="Button", type=gpiod.LINE_REQ_EV_RISING_EDGE)
 yellow_led_line = chip.get_line(YELLOW_LED_PIN)
 yellow_led_line.request(consumer="Yellow_LED", type=gpiod.LINE_REQ_DIR_OUT, default_vals=[0])
 
 # Set up UDP socket for communication and enable broadcast mode
+RECV_BUF_SIZE = 4_000_000  # Requested receive buffer; default ~200 KB drops bursts
 sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+if hasattr(socket, 'SO_REUSEPORT'):
+    # Allow multiple listener processes to share the queue
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
 sock.bind(('', localPort))
 sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
 
+# Grow the receive buffer so a burst from several ESP32s is not silently dropped
+try:
+    # SO_RCVBUFFORCE ignores the rmem_max cap, but needs root
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUFFORCE, RECV_BUF_SIZE)
+except (AttributeError, PermissionError, OSError):
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECV_BUF_SIZE)
+
+actual_rcvbuf = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+print(f"UDP receive buffer: {actual_rcvbuf} bytes (requested {RECV_BUF_SIZE})")
+if actual_rcvbuf < RECV_BUF_SIZE:
+    print("Receive buffer was capped by the kernel. To raise the limits, run:")
+    print("  sudo sysctl -w net.core.rmem_max=12582912 net.core.netdev_max_backlog=5000")
+
 print(f"Listening for incoming messages on port {localPort}...")
 
-# Global variables
-PREV_BUTTON_STATE = 0
-RESET_REQUEST = False  # Tracks if a reset request is active
-STOP_THREADS = False
-ANALOG_READINGS = deque(maxlen=30)  # Store up to 30 readings (one per second)
-SWARM_COLORS = {}  # To store assigned colors for each Swarm ID
-CURRENT_MASTER = None  # To track the current master Swarm ID
-MASTER_DURATION_TRACK = defaultdict(int)  # To track how long each Swarm ID has been master
-MASTER_LOG_TRACK = defaultdict(list)  # Raw data logs for each master
-LOG_FILE = None
-start_time = datetime.now()
+# Self-pipe: one byte written on shutdown unblocks the receive wait immediately,
+# instead of relying on sock.close() racing a thread that is mid-recv
+stop_r_fd, stop_w_fd = os.pipe()
+_selector = selectors.DefaultSelector()
+_selector.register(sock, selectors.EVENT_READ)
+_selector.register(stop_r_fd, selectors.EVENT_READ)
 
-def get_new_log_file():
-    """Creates a new log file with the current timestamp."""
-    # Inputs: None
-    # Process: Generate a timestamp and create a log file name
-    # Output: Updates the global LOG_FILE variable with the new log file name and prints the name
-    global LOG_FILE
-    timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
-    LOG_FILE = f"master_log_{timestamp}.txt"
-    print(f"New log file created: {LOG_FILE}")
-
-def save_current_logs():
-    """Save the logs to the current log file."""
+def wait_for_datagrams():
+    """Block until the socket is readable; False means shutdown was signalled."""
     # Inputs: None
-    # Process: Writes the current log information (masters summary, raw logs) to the LOG_FILE
-    # Output: Saves the log data to a file and prints the save confirmation
-    global LOG_FILE, MASTER_DURATION_TRACK, MASTER_LOG_TRACK
-    if not LOG_FILE:
-        return
-    
-    with open(LOG_FILE, 'w') as log_file:
-        log_file.write(f"Log File Created: {datetime.now()}\n\n")
-        log_file.write("Masters Summary:\n")
-        for swarm_id, duration in MASTER_DURATION_TRACK.items():
-            log_file.write(f"Swarm ID: {swarm_id}, Total Master Duration: {duration} seconds\n")
-        
-        log_file.write("\nRaw Data Logs:\n")
-        for ip, logs in MASTER_LOG_TRACK.items():
-            log_file.write(f"\nIP: {ip}\n")
-            log_file.write('\n'.join(logs) + '\n')
-    
-    print(f"Logs saved to {LOG_FILE}")
-
-def reset_system():
-    """Function to handle reset message."""
-    # Inputs: None
-    # Process: Resets global variables, broadcasts a reset message, and signals a reset with the yellow LED
-    # Output: Updates relevant variables, sends a broadcast, and controls the yellow LED
-    global RESET_REQUEST, SWARM_COLORS, CURRENT_MASTER, MASTER_DURATION_TRACK, LOG_FILE, ANALOG_READINGS
-    
-    RESET_REQUEST = True  # Prevents other actions during reset
+    # Process: Waits on the socket and the shutdown pipe at the same time
+    # Output: True when datagrams are ready, False when the self-pipe fired
+    for key, _ in _selector.select():
+        if key.fd == stop_r_fd:
+            return False
+    return True
+
+# Batched UDP receive: pull up to RECV_BATCH datagrams per recvmmsg syscall
+RECV_BATCH = 64  # Maximum datagrams fetched in one syscall
+RECV_DGRAM_SIZE = 1024  # Per-datagram buffer size (matches the old recvfrom size)
+
+if sys.platform == 'linux':
+    # Python's stdlib has no recvmmsg, so bind it from libc with ctypes
+    _libc = ctypes.CDLL(None, use_errno=True)
+
+    class _iovec(ctypes.Structure):
+        _fields_ = [('iov_base', ctypes.c_void_p),
+                    ('iov_len', ctypes.c_size_t)]
+
+    class _sockaddr_in(ctypes.Structure):
+        _fields_ = [('sin_family', ctypes.c_ushort),
+                    ('sin_port', ctypes.c_uint16),
+                    ('sin_addr', ctypes.c_uint8 * 4),
+                    ('sin_zero', ctypes.c_uint8 * 8)]
+
+    class _msghdr(ctypes.Structure):
+        _fields_ = [('msg_name', ctypes.c_void_p),
+                    ('msg_namelen', ctypes.c_uint32),
+                    ('msg_iov', ctypes.POINTER(_iovec)),
+                    ('msg_iovlen', ctypes.c_size_t),
+                    ('msg_control', ctypes.c_void_p),
+                    ('msg_controllen', ctypes.c_size_t),
+                    ('msg_flags', ctypes.c_int)]
+
+    class _mmsghdr(ctypes.Structure):
+        _fields_ = [('msg_hdr', _msghdr),
+                    ('msg_len', ctypes.c_uint)]
+
+    # Pre-allocated receive state: one contiguous buffer sliced per datagram
+    _recv_buf = bytearray(RECV_BATCH * RECV_DGRAM_SIZE)
+    _recv_buf_addr = ctypes.addressof((ctypes.c_char * len(_recv_buf)).from_buffer(_recv_buf))
+    _iovecs = (_iovec * RECV_BATCH)()
+    _addrs = (_sockaddr_in * RECV_BATCH)()
+    _hdrs = (_mmsghdr * RECV_BATCH)()
+    for _i in range(RECV_BATCH):
+        _iovecs[_i].iov_base = _recv_buf_addr + _i * RECV_DGRAM_SIZE
+        _iovecs[_i].iov_len = RECV_DGRAM_SIZE
+        _hdrs[_i].msg_hdr.msg_name = ctypes.addressof(_addrs[_i])
+        _hdrs[_i].msg_hdr.msg_namelen = ctypes.sizeof(_sockaddr_in)
+        _hdrs[_i].msg_hdr.msg_iov = ctypes.pointer(_iovecs[_i])
+        _hdrs[_i].msg_hdr.msg_iovlen = 1
+
+    def recv_batch():
+        """Wait for readiness, then drain up to RECV_BATCH datagrams in one syscall."""
+        # Inputs: None
+        # Process: Blocks until the socket is readable, then calls recvmmsg once
+        # Output: List of (message_bytes, (ip, port)) tuples, or None on shutdown
+        if not wait_for_datagrams():
+            return None
+        count = _libc.recvmmsg(sock.fileno(), _hdrs, RECV_BATCH, socket.MSG_DONTWAIT, None)
+        if count < 0:
+            err = ctypes.get_errno()
+            if err in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                return []
+            raise OSError(err, os.strerror(err))
+
+        batch = []
+        for i in range(count):
+            start = i * RECV_DGRAM_SIZE
+            data = bytes(_recv_buf[start:start + _hdrs[i].msg_len])
+            ip = '.'.join(str(octet) for octet in _addrs[i].sin_addr)
+            port = socket.ntohs(_addrs[i].sin_port)
+            batch.append((data, (ip, port)))
+            _hdrs[i].msg_hdr.msg_namelen = ctypes.sizeof(_sockaddr_in)  # Reset for reuse
+        return batch
+else:
+    def recv_batch():
+        """Fallback for non-Linux platforms: one datagram per recvfrom call."""
+        # Inputs: None
+        # Process: Waits for readiness, then blocks on a single recvfrom
+        # Output: Single-element list of (message_bytes, (ip, port)), or None on shutdown
+        if not wait_for_datagrams():
+            return None
+        return [sock.recvfrom(RECV_DGRAM_SIZE)]
+
+# Shared constants
+ANALOG_WINDOW = 30  # Seconds of readings shown on the line graph
+ANALOG_MAX = 1023  # The ESPs report 10-bit ADC readings
+MAX_LOG_ENTRIES = 10_000  # Per-IP raw log cap; rotate to a new file once reached
+# Swarm colors are stored as RGBA tuples so Matplotlib never has to re-parse
+# a CSS color name on a draw
+SWARM_COLOR_CYCLE = (to_rgba('red'), to_rgba('green'), to_rgba('yellow'))
+DEFAULT_COLOR = to_rgba('blue')
+start_time = datetime.now()
+# Offset between the wall clock and the monotonic clock, captured once so that
+# cheap monotonic_ns stamps can be turned back into wall-clock times on format
+TIME_BASE_NS = time.time_ns() - time.monotonic_ns()
+
+@dataclass(slots=True)
+class AppState:
+    """Mutable runtime state, shared by reference between the threads.
+
+    slots=True makes every field a fixed attribute slot instead of a dict
+    entry, so the hot paths do C-level attribute fetches rather than
+    module-dict LOAD_GLOBAL lookups.
+    """
+    lock: threading.Lock = field(default_factory=threading.Lock)  # Guards the swarm/master fields
+    # Reentrant because rotation holds it across save + reopen, which take it too
+    log_lock: threading.RLock = field(default_factory=threading.RLock)  # Guards log_fh swaps and writes
+    reset_request: bool = False  # Tracks if a reset request is active
+    stop_threads: bool = False
+    analog_buf: np.ndarray = field(default_factory=lambda: np.zeros(ANALOG_WINDOW, dtype=np.int16))  # Ring buffer of recent readings
+    analog_write_idx: int = 0  # Next slot to overwrite in analog_buf
+    swarm_colors: dict = field(default_factory=dict)  # Assigned RGBA color for each Swarm ID
+    current_master: str | None = None  # The current master Swarm ID
+    master_duration_track: defaultdict = field(default_factory=lambda: defaultdict(int))  # Seconds each Swarm ID has been master
+    master_log_track: defaultdict = field(default_factory=lambda: defaultdict(lambda: deque(maxlen=MAX_LOG_ENTRIES)))  # Raw records per IP
+    log_file: str | None = None
+    log_fh: object = None  # Open handle for the current log file; entries are appended on arrival
+    led_timer: threading.Timer | None = None  # Pending LED-off timer from the last reset
+    raw_messages: queue.SimpleQueue = field(default_factory=queue.SimpleQueue)  # Producer/consumer handoff of raw datagrams
+    new_swarm_ids: queue.SimpleQueue = field(default_factory=queue.SimpleQueue)  # Swarm IDs the plot thread still has to add bars for
+
+def format_log_entry(ts_ns, swarm_id, reading):
+    """Format a raw (timestamp, swarm_id, reading) record into a log line."""
+    # Inputs: Monotonic timestamp in ns, Swarm ID string, analog reading int
+    # Process: Converts the monotonic stamp back to wall-clock time and formats
+    # Output: The human-readable log line for this record
+    wall_time = datetime.fromtimestamp((TIME_BASE_NS + ts_ns) / 1e9)
+    return f"Time: {wall_time}, Swarm ID: {swarm_id}, Reading: {reading}"
+
+def request_shutdown(state):
+    """Signal every thread to stop and unblock the receive wait."""
+    # Inputs: The shared AppState
+    # Process: Sets the stop flag and writes one byte to the self-pipe
+    # Output: Receive and consumer threads exit within one loop iteration
+    state.stop_threads = True
+    os.write(stop_w_fd, b'x')
+
+def get_new_log_file(state):
+    """Creates a new log file with the current timestamp and opens it for appending."""
+    # Inputs: The shared AppState
+    # Process: Closes the previous log file (if any), generates a timestamp, opens a new file
+    # Output: Updates state.log_file/log_fh and prints the new file name
+    with state.log_lock:  # The consumer writes log_fh per packet; never swap it under them
+        if state.log_fh:
+            state.log_fh.close()
+        timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+        state.log_file = f"master_log_{timestamp}.txt"
+        state.log_fh = open(state.log_file, 'a', buffering=1 << 16)
+        state.log_fh.write(f"Log File Created: {datetime.now()}\n\nRaw Data Logs:\n")
+    print(f"New log file created: {state.log_file}")
+
+def save_current_logs(state):
+    """Write the buffered raw records and the masters summary, then flush to disk."""
+    # Inputs: The shared AppState
+    # Process: Formats the compact (ts_ns, swarm_id, reading) records in batch and
+    #          writes them with the masters summary; the formatting cost is paid
+    #          here, once per save, instead of once per packet on the hot path
+    # Output: Durable log file on disk and a save confirmation print
+    with state.log_lock:
+        if not state.log_fh:
+            return
+
+        for ip, records in state.master_log_track.items():
+            state.log_fh.write(f"\nIP: {ip}\n")
+            state.log_fh.writelines(f"{format_log_entry(*record)}\n" for record in records)
+
+        # Snapshot under the state lock: the plot thread inserts/increments
+        # keys in this dict on its 1 Hz tick
+        with state.lock:
+            durations = list(state.master_duration_track.items())
+
+        state.log_fh.write("\nMasters Summary:\n")
+        for swarm_id, duration in durations:
+            state.log_fh.write(f"Swarm ID: {swarm_id}, Total Master Duration: {duration} seconds\n")
+        state.log_fh.flush()
+        os.fsync(state.log_fh.fileno())
+
+    print(f"Logs saved to {state.log_file}")
+
+def rotate_logs(state):
+    """Save the buffered logs and start a fresh file with an empty buffer."""
+    # Inputs: The shared AppState
+    # Process: One atomic save -> new file -> clear sequence under the log lock
+    # Output: Previous file durable on disk, record buffer emptied for the new file
+    with state.log_lock:
+        save_current_logs(state)
+        get_new_log_file(state)
+        state.master_log_track.clear()
+
+def _finish_reset(state):
+    """Timer callback: turn the reset LED off and re-enable processing."""
+    # Inputs: The shared AppState
+    # Process: Runs 3 seconds after reset_system lit the LED
+    # Output: LED off, reset_request cleared so the listener resumes
+    yellow_led_line.set_value(0)
+    state.reset_request = False
 
-    # Broadcast reset request message to all devices
-    reset_message = f"{RPi_startBit}RESET_REQUESTED{RPi_endBit}"
-    print(f"Button is pressed. Broadcast: {reset_message}")
-    sock.sendto(reset_message.encode('utf-8'), ('<broadcast>', localPort))
+def reset_system(state):
+    """Function to handle reset message."""
+    # Inputs: The shared AppState
+    # Process: Resets shared state, broadcasts a reset message, and signals a reset with the yellow LED
+    # Output: Updates relevant fields, sends a broadcast, and controls the yellow LED
+    state.reset_request = True  # Prevents other actions during reset
+
+    # Broadcast reset request message to all devices; MSG_DONTWAIT so a full
+    # send buffer can never stall the button thread
+    print(f"Button is pressed. Broadcast: {RESET_MSG.decode('ascii')}")
+    try:
+        sock.sendto(RESET_MSG, socket.MSG_DONTWAIT, ('<broadcast>', localPort))
+    except BlockingIOError:
+        print("Send buffer full, reset broadcast dropped")
 
     # Reset swarm colors, master tracking, durations, and analog readings
-    SWARM_COLORS = {}
-    CURRENT_MASTER = None
-    MASTER_DURATION_TRACK.clear()
-    ANALOG_READINGS.clear()
-
-    # Light up yellow LED for 3 seconds to indicate reset
+    with state.lock:
+        state.swarm_colors.clear()
+        state.current_master = None
+        state.master_duration_track.clear()
+        state.analog_buf.fill(0)
+
+    # Light up yellow LED to indicate reset; a timer turns it off and clears
+    # the reset flag, so this thread returns immediately instead of sleeping.
+    # Cancel any timer still pending from a previous press, otherwise it would
+    # fire early and cut this reset's quiesce window short
     yellow_led_line.set_value(1)
-    time.sleep(3)
-    yellow_led_line.set_value(0)
-    
-    RESET_REQUEST = False
-
-def listen_for_messages():
-    """Function to listen for UDP messages, process sensor data, and control the LED."""
-    # Inputs: None
-    # Process: Listens for UDP messages, processes them, updates relevant global variables
-    # Output: Updates global state based on received data (analog readings, swarm ID, etc.)
-    global RESET_REQUEST, STOP_THREADS, CURRENT_MASTER, LOG_FILE
-
-    while not STOP_THREADS:
-        if not RESET_REQUEST:  # Skip listening if reset is active
-            try:
-                message, address = sock.recvfrom(1024)
-            except socket.error:
-                break  # Break if socket is closed
-
-            message = message.decode('utf-8')
-
-            # Check for message start and end delimiters
-            if message.startswith(RPi_startBit) and message.endswith(RPi_endBit):
-                data = message[len(RPi_startBit):-len(RPi_endBit)]
-                ip = address[0]
-
-                if ',' in data:
-                    swarm_id, analog_reading = data.split(',')  
-                else:
-                    continue
-
-                log_entry = f"Time: {datetime.now()}, Swarm ID: {swarm_id}, Reading: {analog_reading}"
-                MASTER_LOG_TRACK[ip].append(log_entry)
-                print(f"Received from {ip}: {log_entry}")
-                
-                # Skip processing if message is reset request confirmation
-                if data == "RESET_REQUESTED":
-                    continue
-                
-                # Extract Swarm ID and analog reading from message
-                swarm_id, analog_reading = data.split(',')
-                # Update the ANALOG_READINGS deque with the new reading
-                ANALOG_READINGS.append(int(analog_reading))
-
+    if state.led_timer:
+        state.led_timer.cancel()
+    state.led_timer = threading.Timer(3.0, _finish_reset, args=(state,))
+    state.led_timer.start()
+
+def _parse_message_py(message):
+    """Pure-Python parser: returns (swarm_id, reading) for a valid report, or None."""
+    # Inputs: Raw datagram bytes
+    # Process: Checks the frame delimiters, splits at the comma, parses the reading
+    # Output: (swarm_id str, reading int) tuple, or None for anything malformed
+    if not (message.startswith(RPi_startBit_bytes) and message.endswith(RPi_endBit_bytes)):
+        return None
+    payload = message[len(RPi_startBit_bytes):-len(RPi_endBit_bytes)]
+    comma = payload.find(b',')
+    if comma < 0:
+        return None
+    try:
+        return payload[:comma].decode('ascii'), int(payload[comma + 1:])
+    except (UnicodeDecodeError, ValueError):
+        return None
+
+try:
+    # Compiled hot-path parser; build with `python setup.py build_ext --inplace`
+    from parser import parse as parse_message
+except ImportError:
+    parse_message = _parse_message_py
+
+# Thread placement: the Pi 5's four A76 cores are identical, so dedicate one to
+# the receive thread and keep the Matplotlib redraws on another
+RECV_CPU_CORE = 3
+PLOT_CPU_CORE = 0
+RECV_FIFO_PRIORITY = 20  # SCHED_FIFO priority for the receive thread (needs CAP_SYS_NICE)
+
+def set_thread_affinity_and_priority(core, fifo_priority=None):
+    """Pin the calling thread to one core, optionally with SCHED_FIFO priority."""
+    # Inputs: CPU core index, optional real-time priority
+    # Process: Applies sched_setaffinity/sched_setscheduler to the calling thread
+    # Output: Prints a notice when the real-time scheduler change is not permitted
+    try:
+        os.sched_setaffinity(0, {core})
+    except (AttributeError, OSError):
+        return  # Not supported on this platform; run wherever the scheduler likes
+    if fifo_priority is not None:
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(fifo_priority))
+        except (AttributeError, PermissionError, OSError):
+            print(f"SCHED_FIFO denied (needs CAP_SYS_NICE or root); "
+                  f"thread stays at normal priority on CPU {core}")
+
+def receive_datagrams(state):
+    """Producer: pull raw datagrams off the socket and enqueue them, nothing else."""
+    # Inputs: The shared AppState
+    # Process: Receives datagram batches and puts them on state.raw_messages
+    # Output: Fills state.raw_messages with (message_bytes, address) tuples
+    # Keep the NIC-to-userspace handoff on its own core, ahead of normal tasks
+    set_thread_affinity_and_priority(RECV_CPU_CORE, RECV_FIFO_PRIORITY)
+
+    raw_messages = state.raw_messages
+    while not state.stop_threads:
+        try:
+            batch = recv_batch()
+        except (socket.error, OSError):
+            break  # Break if socket is closed
+
+        if batch is None:
+            break  # Shutdown signalled through the self-pipe
+
+        for item in batch:
+            raw_messages.put(item)
+
+def process_messages(state):
+    """Consumer: parse queued datagrams and update shared state."""
+    # Inputs: The shared AppState
+    # Process: Drains state.raw_messages, parses each message, updates shared state
+    # Output: Updates state based on received data (analog readings, swarm ID, etc.)
+    while not state.stop_threads:
+        try:
+            message, address = state.raw_messages.get(timeout=1)
+        except queue.Empty:
+            continue
+
+        if not state.reset_request:  # Skip processing if reset is active
+            # Sensor reports are "+++<swarm_id>,<reading>***"; anything else
+            # (including reset confirmations) fails to parse and is skipped
+            parsed = parse_message(message)
+            if parsed is None:
+                continue
+
+            swarm_id, analog_reading = parsed
+            ip = address[0]
+
+            # A reading outside the 10-bit ADC range is junk from a misbehaving
+            # ESP; drop it before it can overflow an int16 ring buffer slot
+            if not 0 <= analog_reading <= ANALOG_MAX:
+                continue
+
+            # Stamp with the monotonic clock and buffer the compact record;
+            # it is only formatted when the log is saved
+            record = (time.monotonic_ns(), swarm_id, analog_reading)
+            with state.log_lock:  # save_current_logs iterates the record buffer
+                entries = state.master_log_track[ip]
+                entries.append(record)
+                full = len(entries) == MAX_LOG_ENTRIES
+            # %-style args are only formatted if the INFO level is enabled
+            udp_logger.info("Received from %s: Swarm ID %s, Reading %d", ip, swarm_id, analog_reading)
+
+            # Rotate before the bounded deque starts overwriting old entries
+            if full:
+                rotate_logs(state)
+
+            # Write the new reading into the ring buffer slot
+            state.analog_buf[state.analog_write_idx] = analog_reading
+            state.analog_write_idx = (state.analog_write_idx + 1) % ANALOG_WINDOW
+
+            with state.lock:
                 # Assign color to Swarm ID if it's not already assigned
-                if swarm_id not in SWARM_COLORS:
-                    if len(SWARM_COLORS) == 0:
-                        SWARM_COLORS[swarm_id] = 'red'
-                    elif len(SWARM_COLORS) == 1:
-                        SWARM_COLORS[swarm_id] = 'green'
-                    else:
-                        SWARM_COLORS[swarm_id] = 'yellow'
-
-                if CURRENT_MASTER != swarm_id:
-                    CURRENT_MASTER = swarm_id
+                if swarm_id not in state.swarm_colors:
+                    state.swarm_colors[swarm_id] = SWARM_COLOR_CYCLE[min(len(state.swarm_colors), len(SWARM_COLOR_CYCLE) - 1)]
+                    state.new_swarm_ids.put(swarm_id)  # Tell the plot thread to create its bar
+
+                if state.current_master != swarm_id:
+                    state.current_master = swarm_id
                     print(f"New master detected: {swarm_id}")
 
-                MASTER_DURATION_TRACK[swarm_id] += 1
+DEBOUNCE_SECONDS = 0.05  # Ignore edge events within 50 ms of the last press
 
-def monitor_button():
-    """Monitor the button state and handle resets and log rotation on press."""
-    # Inputs: None
-    # Process: Detects button presses, saves logs, resets the system on press
+def monitor_button(state):
+    """Wait for button press events and handle resets and log rotation on press."""
+    # Inputs: The shared AppState
+    # Process: Blocks on rising-edge events from the kernel, debounces, resets on press
     # Output: Triggers log saving, file creation, and system reset when the button is pressed
-    global PREV_BUTTON_STATE, STOP_THREADS
-
-    while not STOP_THREADS:
-        button_state = button_line.get_value()
-        if button_state == 1 and PREV_BUTTON_STATE == 0:  # Button press detected
-            save_current_logs()  # Save existing logs
-            get_new_log_file()  # Start a new log file
-            reset_system()  # Call reset if button is pressed
-
-        PREV_BUTTON_STATE = button_state
-        time.sleep(0.1)
-
-def plot_graph():
-    # Inputs: None
+    last_press = 0.0
+    while not state.stop_threads:
+        # Block in the kernel until an edge arrives (1 s timeout to re-check the stop flag)
+        if not button_line.event_wait(sec=1):
+            continue
+        button_line.event_read()
+
+        # Debounce: contact bounce fires several edges per physical press
+        now = time.monotonic()
+        if now - last_press < DEBOUNCE_SECONDS:
+            continue
+        last_press = now
+
+        rotate_logs(state)  # Save existing logs and start a new file
+        reset_system(state)  # Call reset if button is pressed
+
+def plot_graph(state):
+    # Inputs: The shared AppState
     # Process: Plots real-time data (analog readings and master durations) in a graph using Matplotlib
     # Output: Displays real-time updated graph with master durations and analog readings
-    global RESET_REQUEST, STOP_THREADS, ANALOG_READINGS, CURRENT_MASTER, SWARM_COLORS, MASTER_DURATION_TRACK
+    # Keep redraw work off the core reserved for the receive thread
+    set_thread_affinity_and_priority(PLOT_CPU_CORE)
 
     # Variables for graphing
-    x_data = list(range(30))  # X-axis for line graph
-    y_data = [0] * 30  # Initial Y-axis data
-    bar_data = defaultdict(int)  # Bar data for master durations
-
-    while not STOP_THREADS:
-        # Initialize the figure and subplots
-        fig, (ax1, ax2) = plt.subplots(2, 1)
-        fig.subplots_adjust(hspace=0.5)
-
-        # Configure line graph (real-time readings)
-        ax1.set_ylim(0, 1023)
-        ax1.set_xlim(0, 29)
-        ax1.set_xlabel('Time (seconds ago)')
-        ax1.set_ylabel('Analog Reading')
-        ax1.set_title('Real-time Analog Readings (last 30 seconds)')
-        line, = ax1.plot(x_data, y_data, color='blue', lw=2)
-
-        # Configure bar graph (master durations)
-        ax2.set_ylim(0, 30)
-        ax2.set_xlabel('Swarm ID')
-        ax2.set_ylabel('Duration (seconds)')
-        ax2.set_title('Master Device Durations (total time)')
-
-        def update_plot(frame):
-            nonlocal line, y_data
-
-            # Update the line graph data
-            if ANALOG_READINGS:
-                y_data = list(ANALOG_READINGS) + [0] * (30 - len(ANALOG_READINGS))
-            else:
-                y_data = [0] * 30
-
-            # Update line color based on current master
-            if CURRENT_MASTER:
-                color = SWARM_COLORS.get(CURRENT_MASTER, 'blue')
-                line.set_color(color)
-
-                # Update master duration
-                bar_data[CURRENT_MASTER] += 1
-
-            line.set_ydata(y_data)
-            return line,
-
-        def update_bar(frame):
-            ax2.clear()
-            ax2.bar(MASTER_DURATION_TRACK.keys(), MASTER_DURATION_TRACK.values(), 
-                    color=[SWARM_COLORS.get(sid, 'blue') for sid in MASTER_DURATION_TRACK.keys()])
-            ax2.set_ylim(0, max(MASTER_DURATION_TRACK.values(), default=30))
-            ax2.set_xlabel('Swarm ID')
-            ax2.set_ylabel('Duration (seconds)')
-            ax2.set_title('Master Device Durations (total time)')
-
-        # Setup animations
-        ani1 = FuncAnimation(fig, update_plot, interval=1000)
-        ani2 = FuncAnimation(fig, update_bar, interval=1000)
-
-        # Display the plot
-        plt.show()
-
-        # Check for reset
-        while RESET_REQUEST:
-            plt.close(fig)  # Close the current figure
-            x_data = list(range(30))  # Reset X data
-            y_data = [0] * 30  # Reset Y data
-            bar_data.clear()  # Reset bar data
-            MASTER_DURATION_TRACK.clear()  # Reset master durations
-            break  # Exit the inner loop to reinitialize the graph
+    x_data = np.arange(ANALOG_WINDOW)  # X-axis for line graph
+
+    # Initialize the figure and subplots once for the process lifetime
+    fig, (ax1, ax2) = plt.subplots(2, 1)
+    fig.subplots_adjust(hspace=0.5)
+
+    # Configure line graph (real-time readings)
+    ax1.set_ylim(0, ANALOG_MAX)
+    ax1.set_xlim(0, ANALOG_WINDOW - 1)
+    ax1.set_xlabel('Time (seconds ago)')
+    ax1.set_ylabel('Analog Reading')
+    ax1.set_title('Real-time Analog Readings (last 30 seconds)')
+    line, = ax1.plot(x_data, state.analog_buf, color=DEFAULT_COLOR, lw=2)
+
+    # Configure bar graph (master durations)
+    ax2.set_ylim(0, 30)
+    ax2.set_xlabel('Swarm ID')
+    ax2.set_ylabel('Duration (seconds)')
+    ax2.set_title('Master Device Durations (total time)')
+
+    # Persistent bar artists: one Rectangle per Swarm ID, mutated across frames
+    bar_artists = {}
+
+    def update_plot(frame):
+        # Rotate the ring buffer so the oldest reading sits at x=0
+        line.set_ydata(np.roll(state.analog_buf, -state.analog_write_idx))
+
+        # Snapshot shared state under the lock so the consumer can't resize
+        # the dicts while we iterate them
+        with state.lock:
+            master = state.current_master
+            # This callback ticks at 1 Hz, so crediting the current master one
+            # unit here is what actually makes the counter a duration in seconds
+            # (the old per-packet increment counted packets, not time)
+            if master:
+                state.master_duration_track[master] += 1
+            colors = dict(state.swarm_colors)
+            durations = dict(state.master_duration_track)
+
+        # Update line color based on current master
+        if master:
+            line.set_color(colors.get(master, DEFAULT_COLOR))
+
+        # Create a bar for each Swarm ID the listener has announced since last tick
+        while True:
+            try:
+                sid = state.new_swarm_ids.get_nowait()
+            except queue.Empty:
+                break
+            if sid not in bar_artists:
+                bar_artists[sid] = ax2.bar([sid], [0], color=colors.get(sid, DEFAULT_COLOR))[0]
+
+        # Mutate the existing rectangles instead of redrawing the whole axes
+        for sid, rect in bar_artists.items():
+            rect.set_height(durations.get(sid, 0))
+
+        # Grow the y-axis only when the tallest bar outgrows it
+        tallest = max(durations.values(), default=30)
+        if tallest > ax2.get_ylim()[1]:
+            ax2.set_ylim(0, tallest)
+
+        return (line, *bar_artists.values())
+
+    # Setup one animation with blitting so only the changed artists are redrawn
+    ani = FuncAnimation(fig, update_plot, interval=1000, blit=True, cache_frame_data=False)
+
+    # Display the plot
+    plt.show()
 
 
 # Main entry point to start button monitoring, message listening, and graph display
 if __name__ == "__main__":
     try:
-        get_new_log_file()  # Initialize the first log file
+        state = AppState()  # One shared state object, passed to every thread
+        get_new_log_file(state)  # Initialize the first log file
 
-        # Create separate threads for button monitoring, message reception, and plotting
-        button_thread = threading.Thread(target=monitor_button)
-        receive_thread = threading.Thread(target=listen_for_messages)
-        graph_thread = threading.Thread(target=plot_graph)
+        # Create separate threads for button monitoring, message handling, and plotting
+        button_thread = threading.Thread(target=monitor_button, args=(state,))
+        receive_thread = threading.Thread(target=receive_datagrams, args=(state,), daemon=True)
+        process_thread = threading.Thread(target=process_messages, args=(state,), daemon=True)
+        graph_thread = threading.Thread(target=plot_graph, args=(state,))
 
         # Start the threads
         button_thread.start()
         receive_thread.start()
+        process_thread.start()
         graph_thread.start()
 
         # Keep the program running by joining the threads
         button_thread.join()
         receive_thread.join()
+        process_thread.join()
         graph_thread.join()
 
     except KeyboardInterrupt:
         print("\nKeyboard interrupt detected. Shutting down...")
-        STOP_THREADS = True  # Signal threads to stop
-        sock.close()  # Close the socket
+        request_shutdown(state)  # Signal threads to stop and unblock the receive wait
         button_thread.join()  # Ensure the threads are properly stopped
         receive_thread.join()
+        process_thread.join()
+        sock.close()  # Close the socket once nothing is reading from it
+        _udp_listener.stop()  # Flush any queued diagnostics
         print("Shutdown complete.")
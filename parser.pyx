@@ -0,0 +1,60 @@
+# cython: language_level=3
+"""C-level parser for framed ESP sensor reports ("+++<swarm_id>,<reading>***").
+
+Optional accelerator for the receive hot path. Build it in place with:
+
+    python setup.py build_ext --inplace
+
+main.py falls back to a pure-Python parser when this module is absent.
+"""
+
+from libc.string cimport memcmp
+from libc.stdlib cimport strtol
+from cpython.bytes cimport PyBytes_AsStringAndSize
+
+DEF START_LEN = 3
+DEF END_LEN = 3
+
+cdef const char* START_BIT = b"+++"
+cdef const char* END_BIT = b"***"
+
+
+cpdef parse(bytes msg):
+    """Return (swarm_id, reading) for a valid sensor report, or None."""
+    # Inputs: Raw datagram bytes
+    # Process: Checks the frame delimiters with memcmp, locates the comma,
+    #          parses the reading with strtol
+    # Output: (swarm_id str, reading int) tuple, or None for anything malformed
+    cdef char* buf
+    cdef Py_ssize_t size, i, comma
+    cdef char* endptr
+    cdef long reading
+
+    if PyBytes_AsStringAndSize(msg, &buf, &size) < 0:
+        return None
+    # Shortest valid report: delimiters plus a one-char ID, comma and digit
+    if size < START_LEN + END_LEN + 3:
+        return None
+    if memcmp(buf, START_BIT, START_LEN) != 0:
+        return None
+    if memcmp(buf + size - END_LEN, END_BIT, END_LEN) != 0:
+        return None
+
+    comma = -1
+    for i in range(START_LEN, size - END_LEN):
+        if buf[i] == c',':
+            comma = i
+            break
+    if comma < 0:
+        return None
+
+    # bytes objects are NUL-terminated, so strtol stops at the end delimiter;
+    # endptr == start means zero digits consumed (e.g. "+++S1,***")
+    reading = strtol(buf + comma + 1, &endptr, 10)
+    if endptr == buf + comma + 1 or endptr != buf + size - END_LEN:
+        return None
+
+    try:
+        return msg[START_LEN:comma].decode('ascii'), reading
+    except UnicodeDecodeError:
+        return None
@@ -0,0 +1,8 @@
+"""Builds the optional Cython datagram parser: python setup.py build_ext --inplace"""
+from setuptools import setup
+from Cython.Build import cythonize
+
+setup(
+    name="esp-logger-parser",
+    ext_modules=cythonize("parser.pyx", language_level=3),
+)